@@ -3,8 +3,9 @@
 Settings utilities for Django apps.
 """
 
-import re
-from functools import reduce
+import inspect
+import sys
+from functools import lru_cache, partial
 from importlib import import_module
 
 try:
@@ -13,26 +14,88 @@ except ImportError:
     class ImproperlyConfigured(RuntimeError):
         pass
 
+try:
+    from django.utils.functional import SimpleLazyObject
+except ImportError:
+    SimpleLazyObject = None
+
 
+@lru_cache(maxsize = None)
 def import_callable(python_path):
     """
     Smarter version of Django's import_string that can deal with importing
     nested classes and static method references.
+
+    Results are cached, so each distinct path is only resolved once.
     """
-    module_parts = python_path.split('.')
+    mod_name = python_path
     attribute_parts = []
     imported_mod = None
-    # Keep removing parts from the path until we find a module
-    while imported_mod is None and module_parts:
+    modules = sys.modules
+    # Keep removing parts from the end of the path until we find a module
+    while mod_name:
+        # Avoid the import machinery, and the import lock, for modules that are
+        # already loaded
+        # A None entry in sys.modules blocks the import, so leave that to import_module
+        imported_mod = modules.get(mod_name)
+        if imported_mod is not None:
+            break
         try:
-            imported_mod = import_module('.'.join(module_parts))
+            imported_mod = import_module(mod_name)
+            break
         except ModuleNotFoundError:
-            attribute_parts.insert(0, module_parts.pop())
+            mod_name, _, attribute = mod_name.rpartition('.')
+            attribute_parts.append(attribute)
     # If no module was found, raise a module not found error for the original path
     if imported_mod is None:
         _ = import_module(python_path)
     # Otherwise, use getattr to traverse the attribute parts
-    return reduce(getattr, attribute_parts, imported_mod)
+    obj = imported_mod
+    for part in reversed(attribute_parts):
+        obj = getattr(obj, part)
+    return obj
+
+
+#: Sentinel object representing a missing value, since ``None`` is a valid value
+_MISSING = object()
+
+
+class _ListIndex(int):
+    # Marks a part of a setting prefix as a list index rather than a dict key
+    __slots__ = ()
+
+
+#: The Django settings, imported on first use
+_django_settings = None
+
+
+def _get_django_settings():
+    # Import the Django settings once and keep a reference to them
+    global _django_settings
+    if _django_settings is None:
+        from django.conf import settings
+        _django_settings = settings
+    return _django_settings
+
+
+def _inspect_signature(factory):
+    # Not every callable has a signature that can be inspected, e.g. some builtins
+    try:
+        return inspect.signature(factory)
+    except (TypeError, ValueError):
+        return None
+
+
+_cached_signature = lru_cache(maxsize = None)(_inspect_signature)
+
+
+def _signature(factory):
+    # Signatures are cached, except for unhashable callables which cannot be
+    # used as cache keys
+    try:
+        return _cached_signature(factory)
+    except TypeError:
+        return _inspect_signature(factory)
 
 
 class SettingsObject:
@@ -41,15 +104,47 @@ class SettingsObject:
 
     Args:
         name: The name of the settings object.
-        user_settings: A dictionary of user settings. OPTIONAL. If not given,
-                       use ``django.conf.settings.<name>``.
+        user_settings: A dictionary of user settings, or a callable returning one.
+                       OPTIONAL. If not given, use ``django.conf.settings.<name>``.
+
+    The user settings are not loaded until they are first needed, so creating a
+    settings object does not force the Django settings to be configured.
+
+    Subclasses that do not need any additional instance attributes can declare
+    ``__slots__ = ()`` to avoid the creation of an instance ``__dict__``.
     """
+    __slots__ = ('name', '_user_settings', '_cache')
+
     def __init__(self, name, user_settings = None):
         self.name = name
+        self._user_settings = user_settings
+        # Cache of resolved setting values, populated by the setting descriptors
+        self._cache = {}
+
+    @property
+    def user_settings(self):
+        """
+        The dictionary of user settings.
+        """
+        user_settings = self._user_settings
         if user_settings is None:
-            from django.conf import settings
-            user_settings = getattr(settings, self.name, {})
-        self.user_settings = user_settings
+            user_settings = getattr(_get_django_settings(), self.name, {})
+        elif callable(user_settings):
+            user_settings = user_settings()
+            if user_settings is None:
+                raise ImproperlyConfigured(
+                    f'User settings for {self.name} must be a dictionary, not None'
+                )
+        else:
+            return user_settings
+        self._user_settings = user_settings
+        return user_settings
+
+    @user_settings.setter
+    def user_settings(self, user_settings):
+        self._user_settings = user_settings
+        # Values resolved from the previous user settings are no longer valid
+        self._cache = {}
 
 
 class Setting:
@@ -59,36 +154,81 @@ class Setting:
     Args:
         default: Provides a default for the setting. If a callable is given, it
                  is called with the owning py:class:`SettingsObject` as it's only
-                 argument. Defaults to ``NO_DEFAULT``.
+                 argument, or with no arguments if it has no positional parameter
+                 to accept it. Builtin types such as ``dict`` and ``list``, and other
+                 callables without an inspectable signature, are called with no
+                 arguments. Defaults to ``NO_DEFAULT``.
+
+    The value of the setting is resolved on first access and the same value is
+    returned for every subsequent access on the same settings object, including
+    values produced by a callable default such as ``dict``. Values are shared and
+    must not be mutated.
     """
     #: Sentinel object representing no default. A sentinel is required because
     #: ``None`` is a valid default value.
     NO_DEFAULT = object()
+    #: Builtin types that are always called without arguments when used as a default
+    ZERO_ARG_DEFAULTS = (dict, list, set, frozenset, tuple)
 
     def __init__(self, default = NO_DEFAULT):
         self.default = default
 
     def __set_name__(self, owner, name):
         self.name = name
+        # Work out once whether a callable default should be given the settings object
+        self._default_takes_instance = (
+            self.default is not self.NO_DEFAULT and
+            callable(self.default) and
+            self._accepts_instance(self.default)
+        )
+
+    @classmethod
+    def _accepts_instance(cls, func):
+        if func in cls.ZERO_ARG_DEFAULTS:
+            return False
+        # Callables without an inspectable signature are called without arguments
+        try:
+            params = inspect.signature(func).parameters.values()
+        except (TypeError, ValueError):
+            return False
+        # Pass the settings object whenever a positional parameter can take it
+        return any(
+            param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD, param.VAR_POSITIONAL)
+            for param in params
+        )
 
     def __get__(self, instance, owner):
         # Settings should be accessed as instance attributes
-        if not instance:
+        if instance is None:
             raise TypeError('Settings cannot be accessed as class attributes')
+        # Settings are read-only, so the value only needs resolving once per instance
+        # The cache is created here if required, in case a subclass does not call
+        # SettingsObject.__init__
         try:
-            return instance.user_settings[self.name]
-        except KeyError:
+            cache = instance._cache
+        except AttributeError:
+            cache = instance._cache = {}
+        value = cache.get(self.name, _MISSING)
+        if value is _MISSING:
+            value = cache[self.name] = self._get_value(instance)
+        return value
+
+    def _get_value(self, instance):
+        # Resolve the value of the setting for the given instance
+        # Subclasses should override this rather than __get__ so they benefit from caching
+        value = instance.user_settings.get(self.name, _MISSING)
+        if value is _MISSING:
             return self._get_default(instance)
+        return value
 
     def _get_default(self, instance):
         # This is provided as a separate method for easier overriding
         if self.default is self.NO_DEFAULT:
-            raise ImproperlyConfigured('Required setting: {}.{}'.format(instance.name, self.name))
+            raise ImproperlyConfigured(f'Required setting: {instance.name}.{self.name}')
+        elif self._default_takes_instance:
+            return self.default(instance)
         elif callable(self.default):
-            try:
-                return self.default(instance)
-            except TypeError:
-                return self.default()
+            return self.default()
         else:
             return self.default
 
@@ -101,31 +241,35 @@ class MergedDictSetting(Setting):
     """
     Property descriptor for a setting that comprises of a dictionary of defaults
     that is merged with the user-provided value.
+
+    The merge happens on first access and the same merged dictionary is returned
+    for subsequent accesses, so it must not be mutated.
     """
     def __init__(self, defaults):
         self.defaults = defaults
         super().__init__(default = dict)
 
-    def __get__(self, instance, owner):
-        merged = self.defaults.copy()
-        merged.update(super().__get__(instance, owner))
-        return merged
+    def _get_value(self, instance):
+        return {**self.defaults, **super()._get_value(instance)}
 
 
 class NestedSetting(Setting):
     """
     Property descriptor for a setting whose value is a nested settings object.
+
+    The nested settings object is created on first access and the same object is
+    returned for subsequent accesses.
     """
     def __init__(self, settings_class):
         self.settings_class = settings_class
         super().__init__(default = dict)
 
-    def __get__(self, instance, owner):
+    def _get_value(self, instance):
         # Use the value of the setting as user values for an instance of the
         # nested settings class, and return that
         return self.settings_class(
-            '{}.{}'.format(instance.name, self.name),
-            super().__get__(instance, owner)
+            f'{instance.name}.{self.name}',
+            super()._get_value(instance)
         )
 
 
@@ -134,9 +278,13 @@ class ImportStringSetting(Setting):
     Property descriptor for a setting that is a dotted-path string that should be
     imported.
     """
-    def __get__(self, instance, owner):
+    # The imported object is cached per settings object by Setting.__get__ and the
+    # import itself is cached by import_callable
+    # The descriptor is deliberately not replaced on the class with the resolved
+    # object, as settings objects of the same class can have different user settings
+    def _get_value(self, instance):
         return import_callable(
-            super(ImportStringSetting, self).__get__(instance, owner)
+            super(ImportStringSetting, self)._get_value(instance)
         )
 
 
@@ -157,61 +305,142 @@ class ObjectFactorySetting(Setting):
 
     Object factory settings can be nested, so that a parameter of an object factory
     can be another object factory.
+
+    Args:
+        default: The default for the setting. See :py:class:`Setting`.
+        lazy: If ``True``, each factory is called the first time the object it
+              produces is used rather than when the setting is accessed. Parameters
+              are still checked when the setting is accessed. Requires Django.
+              Defaults to ``False``.
+
+    Lazy objects are Django ``SimpleLazyObject`` proxies, which do not forward
+    calls. Factories that return functions or other callables should not be
+    used with ``lazy = True``.
     """
-    MISSING_ARG_REGEX = r"missing \d+ required positional arguments?: "
-    INVALID_ARG_MATCH = "got an unexpected keyword argument"
-    ARG_NAME_REGEX = r"'(\w+)'"
-
-    def _process_item(self, item, prefix):
-        # If the item is a factory dict, do some processing
-        if isinstance(item, dict) and 'FACTORY' in item:
-            factory = import_callable(item['FACTORY'])
-            # Process the params for nested factory definitions
-            kwargs = {
-                k.lower(): self._process_item(v, '{}.PARAMS.{}'.format(prefix, k))
-                for k, v in item.get('PARAMS', {}).items()
-            }
-            # We want to convert type errors for missing or invalid arguments into
-            # errors about missing or invalid settings
+    def __init__(self, default = Setting.NO_DEFAULT, lazy = False):
+        if lazy and SimpleLazyObject is None:
+            raise ImproperlyConfigured('Lazy object factory settings require Django')
+        self.lazy = lazy
+        super().__init__(default)
+
+    @staticmethod
+    def _format_prefix(prefix_parts):
+        # List indexes are marked when they are added, and are formatted as subscripts
+        return ''.join(
+            f'[{part}]' if type(part) is _ListIndex else f'.{part}'
+            for part in prefix_parts
+        )[1:]
+
+    def _check_arguments(self, signature, kwargs, prefix_parts):
+        # Convert arguments that cannot be bound to the signature of the factory into
+        # errors about missing or invalid settings
+        prefix = self._format_prefix(prefix_parts)
+        params = signature.parameters
+        required = [
+            f'{prefix}.PARAMS.{name.upper()}'
+            for name, param in params.items()
+            if (
+                param.default is param.empty and
+                param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD) and
+                name not in kwargs
+            )
+        ]
+        if required:
+            raise ImproperlyConfigured(
+                f"Required setting(s): {', '.join(required)}"
+            )
+        accepts_kwargs = any(p.kind is p.VAR_KEYWORD for p in params.values())
+        invalid = [
+            f'{prefix}.PARAMS.{name.upper()}'
+            for name in kwargs
+            if (
+                (name in params and params[name].kind is params[name].POSITIONAL_ONLY) or
+                (name not in params and not accepts_kwargs)
+            )
+        ]
+        if len(invalid) == 1:
+            raise ImproperlyConfigured(f'Invalid setting: {invalid[0]}')
+        elif invalid:
+            raise ImproperlyConfigured(
+                f"Invalid setting(s): {', '.join(invalid)}"
+            )
+
+    def _call_factory(self, factory, kwargs, prefix_parts):
+        # Check the arguments before calling the factory, rather than trying to
+        # interpret the type error from a failed call
+        signature = _signature(factory)
+        if signature is not None:
             try:
-                return factory(**kwargs)
-            except TypeError as exc:
-                message = str(exc)
-                if re.search(self.MISSING_ARG_REGEX, message):
-                    required = [
-                        '{}.PARAMS.{}'.format(prefix, name.upper())
-                        for name in re.findall(self.ARG_NAME_REGEX, message)
-                    ]
+                signature.bind(**kwargs)
+            except TypeError:
+                self._check_arguments(signature, kwargs, prefix_parts)
+                # Re-raise any other binding error
+                raise
+        if self.lazy:
+            return SimpleLazyObject(partial(factory, **kwargs))
+        return factory(**kwargs)
+
+    def _process_item(self, item, prefix_parts):
+        # The prefix is passed around as a tuple of parts, and is only formatted
+        # when an error needs to be reported
+        # The item is processed using an explicit stack rather than recursion
+        # Each entry is an item to process with the container and key that the processed
+        # item should be stored at, or a marker that the children of a dict or list have
+        # been processed, along with the factory call to make if it is a factory dict
+        processed = {}
+        # The ids of the dicts and lists that are being processed, used to detect cycles
+        active = set()
+        stack = [(item, prefix_parts, processed, None, False)]
+        while stack:
+            item, prefix_parts, container, key, is_done = stack.pop()
+            if is_done:
+                original, call = item
+                active.discard(id(original))
+                if call is not None:
+                    # For a factory call, the params have now been processed
+                    factory, kwargs = call
+                    container[key] = self._call_factory(factory, kwargs, prefix_parts)
+                continue
+            if isinstance(item, (dict, list, tuple)):
+                if id(item) in active:
                     raise ImproperlyConfigured(
-                        'Required setting(s): {}'.format(', '.join(required))
+                        f'Circular reference in setting: {self._format_prefix(prefix_parts)}'
                     )
-                elif self.INVALID_ARG_MATCH in message:
-                    match = re.search(self.ARG_NAME_REGEX, message)
-                    raise ImproperlyConfigured(
-                        'Invalid setting: {}.PARAMS.{}'.format(
-                            prefix, match.group(1).upper()
-                        )
+                active.add(id(item))
+            if isinstance(item, dict):
+                if 'FACTORY' in item:
+                    # If the item is a factory dict, process the params for nested
+                    # factory definitions before calling the factory
+                    factory = import_callable(item['FACTORY'])
+                    kwargs = {}
+                    stack.append(((item, (factory, kwargs)), prefix_parts, container, key, True))
+                    stack.extend(
+                        (v, prefix_parts + ('PARAMS', k), kwargs, k.lower(), False)
+                        for k, v in reversed(item.get('PARAMS', {}).items())
                     )
                 else:
-                    # Re-raise any other type error
-                    raise
-        # For any other dict, convert the values if required
-        if isinstance(item, dict):
-            return {
-                k: self._process_item(v, '{}.{}'.format(prefix, k))
-                for k, v in item.items()
-            }
-        # For a list or tuple, convert the elements if required
-        if isinstance(item, (list, tuple)):
-            return [
-                self._process_item(v, '{}[{}]'.format(prefix, i))
-                for i, v in enumerate(item)
-            ]
-        # For anything else, just return the item
-        return item
+                    # For any other dict, convert the values if required
+                    container[key] = value = {}
+                    stack.append(((item, None), prefix_parts, container, key, True))
+                    stack.extend(
+                        (v, prefix_parts + (k, ), value, k, False)
+                        for k, v in reversed(item.items())
+                    )
+            elif isinstance(item, (list, tuple)):
+                # For a list or tuple, convert the elements if required
+                container[key] = value = [None] * len(item)
+                stack.append(((item, None), prefix_parts, container, key, True))
+                stack.extend(
+                    (item[i], prefix_parts + (_ListIndex(i), ), value, i, False)
+                    for i in reversed(range(len(item)))
+                )
+            else:
+                # For anything else, just use the item
+                container[key] = item
+        return processed[None]
 
-    def __get__(self, instance, owner):
+    def _get_value(self, instance):
         return self._process_item(
-            super(ObjectFactorySetting, self).__get__(instance, owner),
-            '{}.{}'.format(instance.name, self.name)
+            super(ObjectFactorySetting, self)._get_value(instance),
+            (instance.name, self.name)
         )
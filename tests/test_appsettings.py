@@ -0,0 +1,398 @@
+import sys
+import unittest
+
+try:
+    from django.utils.functional import SimpleLazyObject
+except ImportError:
+    SimpleLazyObject = None
+
+from settings_object import (
+    ImproperlyConfigured,
+    import_callable,
+    MergedDictSetting,
+    NestedSetting,
+    ObjectFactorySetting,
+    Setting,
+    SettingsObject,
+)
+
+
+#: Records the names passed to Thing, in the order that they are created
+CREATED = []
+
+
+class Thing:
+    def __init__(self, name, child = None):
+        CREATED.append(name)
+        self.name = name
+        self.child = child
+
+
+def make_pair(first, second = None):
+    return (first, second)
+
+
+def takes_kwargs(first, **kwargs):
+    return (first, kwargs)
+
+
+def positional_only(first, /):
+    return first
+
+
+def raises_type_error(first):
+    raise TypeError('from factory')
+
+
+class Unhashable:
+    __hash__ = None
+
+    def __call__(self, value):
+        return value
+
+
+unhashable = Unhashable()
+
+
+class OptionalSettings:
+    def __init__(self, settings = None):
+        self.settings = settings
+
+
+def factory(name, **params):
+    return {
+        'FACTORY': f'{__name__}.{name}',
+        'PARAMS': params,
+    }
+
+
+class TestSettingDefaults(unittest.TestCase):
+    def test_required(self):
+        class Settings(SettingsObject):
+            SETTING = Setting()
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            Settings('APP', {}).SETTING
+        self.assertEqual(str(ctx.exception), 'Required setting: APP.SETTING')
+
+    def test_callable_defaults(self):
+        class Settings(SettingsObject):
+            VALUE = Setting(default = 2)
+            WITH_INSTANCE = Setting(default = lambda s: s.VALUE * 2)
+            WITHOUT_ARGS = Setting(default = lambda: 'none')
+            VAR_ARGS = Setting(default = lambda *args: len(args))
+            CLASS = Setting(default = OptionalSettings)
+            DICT = Setting(default = dict)
+            LIST = Setting(default = list)
+            TUPLE = Setting(default = tuple)
+        settings = Settings('APP', {})
+        self.assertEqual(settings.WITH_INSTANCE, 4)
+        self.assertEqual(settings.WITHOUT_ARGS, 'none')
+        self.assertEqual(settings.VAR_ARGS, 1)
+        self.assertIs(settings.CLASS.settings, settings)
+        self.assertEqual(settings.DICT, {})
+        self.assertEqual(settings.LIST, [])
+        self.assertEqual(settings.TUPLE, ())
+
+    def test_type_error_in_default_is_not_swallowed(self):
+        def default(settings):
+            raise TypeError('from default')
+        class Settings(SettingsObject):
+            SETTING = Setting(default = default)
+        with self.assertRaisesRegex(TypeError, 'from default'):
+            Settings('APP', {}).SETTING
+
+
+class TestCaching(unittest.TestCase):
+    def test_values_are_cached(self):
+        calls = []
+        def default():
+            calls.append(1)
+            return object()
+        class Settings(SettingsObject):
+            SETTING = Setting(default = default)
+        settings = Settings('APP', {})
+        self.assertIs(settings.SETTING, settings.SETTING)
+        self.assertEqual(len(calls), 1)
+        # Each settings object resolves its own values
+        self.assertIsNot(Settings('APP', {}).SETTING, settings.SETTING)
+
+    def test_merged_dict(self):
+        defaults = {'a': 1, 'b': 2}
+        class Settings(SettingsObject):
+            SETTING = MergedDictSetting(defaults)
+        settings = Settings('APP', {'SETTING': {'b': 3}})
+        self.assertEqual(settings.SETTING, {'a': 1, 'b': 3})
+        self.assertIs(settings.SETTING, settings.SETTING)
+        self.assertEqual(defaults, {'a': 1, 'b': 2})
+
+    def test_nested_object_is_cached(self):
+        class Inner(SettingsObject):
+            VALUE = Setting(default = 1)
+        class Settings(SettingsObject):
+            INNER = NestedSetting(Inner)
+        settings = Settings('APP', {})
+        self.assertIs(settings.INNER, settings.INNER)
+
+    def test_factory_is_called_once(self):
+        CREATED.clear()
+        class Settings(SettingsObject):
+            SETTING = ObjectFactorySetting(default = factory('Thing', NAME = 'once'))
+        settings = Settings('APP', {})
+        self.assertIs(settings.SETTING, settings.SETTING)
+        self.assertEqual(CREATED, ['once'])
+
+    def test_none_is_cached(self):
+        calls = []
+        def default():
+            calls.append(1)
+        class Settings(SettingsObject):
+            SETTING = Setting(default = default)
+        settings = Settings('APP', {})
+        self.assertIsNone(settings.SETTING)
+        self.assertIsNone(settings.SETTING)
+        self.assertEqual(len(calls), 1)
+
+    def test_slots(self):
+        class Settings(SettingsObject):
+            __slots__ = ()
+            SETTING = Setting(default = 1)
+        settings = Settings('APP', {})
+        self.assertEqual(settings.SETTING, 1)
+        self.assertFalse(hasattr(settings, '__dict__'))
+
+    def test_subclass_without_super_init(self):
+        class Settings(SettingsObject):
+            SETTING = Setting(default = 1)
+            def __init__(self):
+                self.name = 'APP'
+                self.user_settings = {'SETTING': 2}
+        self.assertEqual(Settings().SETTING, 2)
+
+
+class TestObjectFactorySetting(unittest.TestCase):
+    def setUp(self):
+        CREATED.clear()
+
+    def get(self, value):
+        class Settings(SettingsObject):
+            SETTING = ObjectFactorySetting()
+        return Settings('APP', {'SETTING': value}).SETTING
+
+    def test_factory(self):
+        obj = self.get(factory('Thing', NAME = 'thing'))
+        self.assertIsInstance(obj, Thing)
+        self.assertEqual(obj.name, 'thing')
+
+    def test_missing_params(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get(factory('make_pair'))
+        self.assertEqual(
+            str(ctx.exception),
+            'Required setting(s): APP.SETTING.PARAMS.FIRST'
+        )
+
+    def test_invalid_param(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get(factory('make_pair', FIRST = 1, THIRD = 3))
+        self.assertEqual(
+            str(ctx.exception),
+            'Invalid setting: APP.SETTING.PARAMS.THIRD'
+        )
+
+    def test_invalid_params(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get(factory('make_pair', FIRST = 1, THIRD = 3, FOURTH = 4))
+        self.assertEqual(
+            str(ctx.exception),
+            'Invalid setting(s): APP.SETTING.PARAMS.THIRD, APP.SETTING.PARAMS.FOURTH'
+        )
+
+    def test_positional_only_param(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get(factory('positional_only', FIRST = 1))
+        self.assertEqual(
+            str(ctx.exception),
+            'Invalid setting: APP.SETTING.PARAMS.FIRST'
+        )
+
+    def test_var_kwargs(self):
+        self.assertEqual(
+            self.get(factory('takes_kwargs', FIRST = 1, OTHER = 2)),
+            (1, {'other': 2})
+        )
+
+    def test_type_error_in_factory_is_not_converted(self):
+        with self.assertRaisesRegex(TypeError, 'from factory'):
+            self.get(factory('raises_type_error', FIRST = 1))
+
+    def test_unhashable_factory(self):
+        self.assertEqual(self.get(factory('unhashable', VALUE = 1)), 1)
+
+    def test_nested_factories(self):
+        value = self.get({
+            'items': [
+                factory('Thing', NAME = 'first'),
+                {'inner': factory('Thing', NAME = 'second', CHILD = factory('Thing', NAME = 'child'))},
+                'plain',
+            ],
+            'other': (1, 2),
+        })
+        self.assertEqual(value['items'][0].name, 'first')
+        self.assertEqual(value['items'][1]['inner'].child.name, 'child')
+        self.assertEqual(value['items'][2], 'plain')
+        self.assertEqual(value['other'], [1, 2])
+        # Keys keep their order, and factories are called in definition order
+        # with params before their parent
+        self.assertEqual(list(value), ['items', 'other'])
+        self.assertEqual(CREATED, ['first', 'child', 'second'])
+
+    def test_error_prefix_in_list(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get({'items': [0, {'inner': factory('make_pair', SECOND = 2)}]})
+        self.assertEqual(
+            str(ctx.exception),
+            'Required setting(s): APP.SETTING.items[1].inner.PARAMS.FIRST'
+        )
+
+    def test_deep_nesting(self):
+        value = factory('Thing', NAME = 'leaf')
+        for i in range(2000):
+            value = factory('Thing', NAME = i, CHILD = value)
+        self.assertEqual(self.get(value).name, 1999)
+
+    def test_shared_reference(self):
+        shared = [1, 2]
+        self.assertEqual(self.get({'a': shared, 'b': shared}), {'a': [1, 2], 'b': [1, 2]})
+
+    def test_circular_list(self):
+        value = []
+        value.append(value)
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get({'items': value})
+        self.assertEqual(
+            str(ctx.exception),
+            'Circular reference in setting: APP.SETTING.items[0]'
+        )
+
+    def test_circular_params(self):
+        value = factory('Thing', NAME = 'outer')
+        value['PARAMS']['CHILD'] = value
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get(value)
+        self.assertEqual(
+            str(ctx.exception),
+            'Circular reference in setting: APP.SETTING.PARAMS.CHILD'
+        )
+
+    def test_error_prefix_with_int_key(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get({1: factory('make_pair', FIRST = 1, THIRD = 3)})
+        self.assertEqual(
+            str(ctx.exception),
+            'Invalid setting: APP.SETTING.1.PARAMS.THIRD'
+        )
+
+    def test_error_prefix_in_params(self):
+        with self.assertRaises(ImproperlyConfigured) as ctx:
+            self.get(factory('Thing', NAME = 'outer', CHILD = factory('Thing')))
+        self.assertEqual(
+            str(ctx.exception),
+            'Required setting(s): APP.SETTING.PARAMS.CHILD.PARAMS.NAME'
+        )
+
+
+class TestLazyObjectFactorySetting(unittest.TestCase):
+    def setUp(self):
+        CREATED.clear()
+
+    @unittest.skipUnless(SimpleLazyObject, 'requires Django')
+    def test_factories_are_called_on_first_use(self):
+        class Settings(SettingsObject):
+            SETTING = ObjectFactorySetting(
+                default = factory('Thing', NAME = 'outer', CHILD = factory('Thing', NAME = 'inner')),
+                lazy = True
+            )
+        value = Settings('APP', {}).SETTING
+        self.assertEqual(CREATED, [])
+        self.assertEqual(value.name, 'outer')
+        self.assertEqual(CREATED, ['outer'])
+        self.assertEqual(value.child.name, 'inner')
+        self.assertEqual(CREATED, ['outer', 'inner'])
+
+    @unittest.skipUnless(SimpleLazyObject, 'requires Django')
+    def test_params_are_checked_on_access(self):
+        class Settings(SettingsObject):
+            SETTING = ObjectFactorySetting(default = factory('Thing'), lazy = True)
+        with self.assertRaises(ImproperlyConfigured):
+            Settings('APP', {}).SETTING
+
+    @unittest.skipIf(SimpleLazyObject, 'requires Django to be missing')
+    def test_requires_django(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ObjectFactorySetting(lazy = True)
+
+
+class TestUserSettings(unittest.TestCase):
+    class Settings(SettingsObject):
+        SETTING = Setting(default = 1)
+
+    def test_not_loaded_on_construction(self):
+        # Neither Django nor its settings are required until a setting is read
+        self.Settings('APP')
+
+    def test_callable_is_loaded_lazily(self):
+        calls = []
+        def load():
+            calls.append(1)
+            return {'SETTING': 2}
+        settings = self.Settings('APP', load)
+        self.assertEqual(calls, [])
+        self.assertEqual(settings.SETTING, 2)
+        self.assertEqual(settings.user_settings, {'SETTING': 2})
+        self.assertEqual(calls, [1])
+
+    def test_callable_returning_none(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.Settings('APP', lambda: None).SETTING
+
+    def test_assignment_clears_cache(self):
+        settings = self.Settings('APP', {})
+        self.assertEqual(settings.SETTING, 1)
+        settings.user_settings = {'SETTING': 3}
+        self.assertEqual(settings.user_settings, {'SETTING': 3})
+        self.assertEqual(settings.SETTING, 3)
+
+
+class TestImportCallable(unittest.TestCase):
+    def setUp(self):
+        import_callable.cache_clear()
+
+    def test_nested_attribute(self):
+        self.assertIs(import_callable(f'{__name__}.Thing.__init__'), Thing.__init__)
+
+    def test_missing_module(self):
+        with self.assertRaises(ModuleNotFoundError) as ctx:
+            import_callable('missing_settings_module.attribute')
+        self.assertEqual(ctx.exception.name, 'missing_settings_module')
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            import_callable(f'{__name__}.Thing.missing')
+
+    def test_results_are_cached(self):
+        first = import_callable(f'{__name__}.Thing')
+        self.assertIs(import_callable(f'{__name__}.Thing'), first)
+        info = import_callable.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_blocked_module(self):
+        sys.modules['blocked_settings_module'] = None
+        try:
+            with self.assertRaises(ModuleNotFoundError):
+                import_callable('blocked_settings_module.attribute')
+        finally:
+            del sys.modules['blocked_settings_module']
+
+
+if __name__ == '__main__':
+    unittest.main()